@@ -8,15 +8,28 @@ Outputs JSON with:
 - tables: list of detected tables (basic detection)
 
 Headings are inferred from font size relative to body text.
+
+With --jsonl, outputs JSON Lines instead: a "document" record with the
+title, body font size and page count, then one "heading" or "table"
+record per line.
 """
 
+import argparse
+import contextlib
+import copy
+import hashlib
 import json
 import os
+import re
+import shutil
 import sys
+import tempfile
+import threading
 import warnings
-from collections import Counter
-from dataclasses import dataclass
-from typing import Optional
+from array import array
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
 
 # Suppress all warnings
 warnings.filterwarnings("ignore")
@@ -24,85 +37,236 @@ os.environ["PYMUPDF_NOWARNING"] = "1"
 
 import fitz  # PyMuPDF
 
+try:
+    import orjson  # Optional, faster JSON encoding
+except ImportError:
+    orjson = None
+
 # Suppress MuPDF warnings at runtime
 fitz.TOOLS.mupdf_display_warnings(False)
 
+# Documents shorter than this are extracted in-process; below it the cost of
+# starting worker processes outweighs the per-page work.
+PARALLEL_MIN_PAGES = 4
+
+# Flush MuPDF's store of cached page resources every this many pages so
+# memory stays bounded on very long documents
+STORE_SHRINK_PAGES = 100
+
+# Text extraction flags: keep whitespace; image blocks and ligature
+# preservation are off, so ligatures are expanded into plain letters. Only
+# span text and font metrics are consumed.
+TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE
+
+# Lines starting with these are never headings (license boilerplate, links,
+# identifiers)
+_SKIP_RE = re.compile(
+    r"(?:provided |permission |reproduce |copyright |https?://|arxiv:|doi:)",
+    re.IGNORECASE,
+)
+
+# ASCII bytes that are not letters; deleting them with bytes.translate()
+# counts the letters of ASCII text in a single C call
+_ASCII_NONALPHA = bytes(c for c in range(128) if not chr(c).isalpha())
+
+# Most recently extracted results, keyed by document identity (see
+# _cache_key) and options, so repeated calls on the same document skip
+# extraction
+RESULT_CACHE_SIZE = 32
+_RESULT_CACHE: OrderedDict[tuple, dict] = OrderedDict()
+_RESULT_CACHE_LOCK = threading.Lock()
+
 
-@dataclass
-class TextBlock:
-    text: str
-    font_size: float
-    font_name: str
-    is_bold: bool
-    page: int
-    x: float
-    y: float
+class Lines(NamedTuple):
+    """Extracted lines stored as parallel columns rather than one object per line."""
+    texts: list[str]
+    sizes: array  # font size, array("d")
+    bolds: bytearray  # bold flag, 0/1
+    pages: array  # 1-based page number, array("i")
 
 
-def extract_text_blocks(doc: fitz.Document) -> list[TextBlock]:
-    """Extract all text blocks with font information."""
-    blocks = []
+def _empty_lines() -> Lines:
+    """Create empty line columns."""
+    return Lines([], array("d"), bytearray(), array("i"))
 
-    for page_num, page in enumerate(doc):
-        # Get detailed text information
-        text_dict = page.get_text("dict", flags=fitz.TEXT_PRESERVE_WHITESPACE)
 
-        for block in text_dict.get("blocks", []):
-            if block.get("type") != 0:  # Skip non-text blocks
+def open_pdf(pdf_path: Optional[str] = None, pdf_bytes: Optional[bytes] = None) -> fitz.Document:
+    """Open a PDF from a file path or in-memory bytes."""
+    if pdf_bytes:
+        return fitz.open(stream=pdf_bytes, filetype="pdf")
+    if pdf_path:
+        # Opening by path lets MuPDF read the file on demand; the explicit
+        # filetype skips content sniffing for paths without a .pdf suffix
+        return fitz.open(pdf_path, filetype="pdf")
+    raise ValueError("Must provide pdf_path or pdf_bytes")
+
+
+def process_pages(
+    doc: fitz.Document,
+    page_indices: Optional[range] = None,
+    fast_tables: bool = False,
+) -> tuple[Lines, list[dict]]:
+    """Extract text lines with font information and detect tables in one pass over the pages."""
+    lines = _empty_lines()
+    texts, sizes, bolds, pages = lines
+    tables = []
+
+    # Font name -> whether the name marks it bold. A document uses only a
+    # handful of fonts, so this avoids lowercasing and scanning the name for
+    # every span. Kept per call: embedded font names carry per-file subset
+    # prefixes, so a shared cache would grow with every document.
+    bold_fonts: dict[str, bool] = {}
+
+    if page_indices is None:
+        page_indices = range(len(doc))
+
+    for page_num in page_indices:
+        page = doc.load_page(page_num)
+        # Build the text page once and extract the dict from it directly
+        textpage = page.get_textpage(flags=TEXT_FLAGS)
+        text_dict = textpage.extractDICT()
+
+        # extractDICT() always fills these keys, so index them directly
+        # rather than paying for .get() with defaults on every span
+        for block in text_dict["blocks"]:
+            if block["type"] != 0:  # Skip non-text blocks
                 continue
 
-            for line in block.get("lines", []):
-                line_text = ""
+            for line in block["lines"]:
+                parts = []
                 line_font_size = 0
-                line_font_name = ""
                 line_is_bold = False
 
-                for span in line.get("spans", []):
-                    text = span.get("text", "").strip()
+                for span in line["spans"]:
+                    text = span["text"].strip()
                     if not text:
                         continue
 
-                    line_text += text + " "
+                    parts.append(text)
                     # Use the largest font in the line
-                    font_size = span.get("size", 0)
+                    font_size = span["size"]
                     if font_size > line_font_size:
                         line_font_size = font_size
-                        line_font_name = span.get("font", "")
                         # Check for bold in font name or flags
-                        flags = span.get("flags", 0)
-                        line_is_bold = (
-                            "bold" in line_font_name.lower() or
-                            "black" in line_font_name.lower() or
-                            (flags & 2 ** 4) != 0  # Bold flag
-                        )
-
-                line_text = line_text.strip()
+                        font_name = span["font"]
+                        name_is_bold = bold_fonts.get(font_name)
+                        if name_is_bold is None:
+                            lower = font_name.lower()
+                            name_is_bold = "bold" in lower or "black" in lower
+                            bold_fonts[font_name] = name_is_bold
+                        line_is_bold = name_is_bold or (span["flags"] & 16) != 0  # Bold flag
+
+                # Spans were stripped and non-empty, so joining needs no strip
+                line_text = " ".join(parts)
                 if line_text and line_font_size > 0:
-                    bbox = line.get("bbox", [0, 0, 0, 0])
-                    blocks.append(TextBlock(
-                        text=line_text,
-                        font_size=line_font_size,
-                        font_name=line_font_name,
-                        is_bold=line_is_bold,
-                        page=page_num + 1,
-                        x=bbox[0],
-                        y=bbox[1],
-                    ))
+                    texts.append(line_text)
+                    sizes.append(line_font_size)
+                    bolds.append(line_is_bold)
+                    pages.append(page_num + 1)
 
-    return blocks
+        # Detect tables on the page that is already loaded. With fast_tables,
+        # pages without vector drawings are skipped: they cannot hold ruled
+        # tables, though borderless tables on them are missed.
+        if not fast_tables or page.get_cdrawings():
+            tables.extend(detect_page_tables(page, page_num + 1))
 
+        # Drop this page's objects before loading the next one
+        page = textpage = text_dict = None
+        if (page_num + 1) % STORE_SHRINK_PAGES == 0:
+            fitz.TOOLS.store_shrink(100)
 
-def find_body_font_size(blocks: list[TextBlock]) -> float:
-    """Find the most common font size (body text)."""
-    if not blocks:
-        return 12.0
+    return lines, tables
 
-    # Round font sizes to avoid floating point issues
-    sizes = [round(b.font_size, 1) for b in blocks]
-    counter = Counter(sizes)
+
+def detect_page_tables(page: fitz.Page, page_number: int) -> list[dict]:
+    """Basic table detection using PyMuPDF's table finder."""
+    tables = []
+
+    try:
+        # PyMuPDF 1.23+ has find_tables()
+        page_tables = page.find_tables()
+        for table in page_tables:
+            # Extract table data
+            data = table.extract()
+            if data and len(data) > 1:  # At least header + 1 row
+                tables.append({
+                    "page": page_number,
+                    "rows": len(data),
+                    "cols": len(data[0]) if data else 0,
+                    "headers": data[0] if data else [],
+                })
+    except AttributeError:
+        # Older PyMuPDF version without find_tables
+        pass
+
+    return tables
+
+
+def available_cpus() -> int:
+    """Number of CPUs this process may run on, honouring CPU affinity."""
+    if hasattr(os, "process_cpu_count"):  # Python 3.13+
+        return os.process_cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _process_page_range(
+    pdf_path: Optional[str],
+    pdf_bytes: Optional[bytes],
+    page_indices: range,
+    fast_tables: bool,
+) -> tuple[Lines, list[dict]]:
+    """Worker entry point: open the document and process a page range."""
+    doc = open_pdf(pdf_path, pdf_bytes)
+    try:
+        return process_pages(doc, page_indices, fast_tables)
+    finally:
+        doc.close()
+
+
+def process_pages_parallel(
+    pdf_path: Optional[str],
+    pdf_bytes: Optional[bytes],
+    page_count: int,
+    fast_tables: bool = False,
+) -> tuple[Lines, list[dict]]:
+    """Process pages by fanning contiguous page ranges out to worker processes."""
+    workers = min(available_cpus(), page_count)
+    chunk_size = -(-page_count // workers)  # ceil division
+    chunks = [
+        range(start, min(start + chunk_size, page_count))
+        for start in range(0, page_count, chunk_size)
+    ]
+
+    lines = _empty_lines()
+    tables = []
+    with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+        futures = [
+            executor.submit(_process_page_range, pdf_path, pdf_bytes, chunk, fast_tables)
+            for chunk in chunks
+        ]
+        # Merge in submission order so results stay in page order
+        for future in futures:
+            chunk_lines, chunk_tables = future.result()
+            for column, chunk_column in zip(lines, chunk_lines):
+                column.extend(chunk_column)
+            tables.extend(chunk_tables)
+
+    return lines, tables
+
+
+def find_body_font_size(sizes: array) -> float:
+    """Find the most common font size (body text)."""
+    # Round font sizes to avoid floating point issues. Documents use few
+    # distinct sizes, so count the raw column first and round once per size
+    # rather than once per line.
+    rounded = Counter()
+    for size, count in Counter(sizes).items():
+        rounded[round(size, 1)] += count
 
     # Most common size is likely body text
-    most_common = counter.most_common(1)
+    most_common = rounded.most_common(1)
     return most_common[0][0] if most_common else 12.0
 
 
@@ -117,112 +281,150 @@ def is_likely_heading(text: str) -> bool:
         return False
 
     # Skip lines that are mostly numbers/special chars (like arxiv IDs)
-    alpha_count = sum(1 for c in text if c.isalpha())
+    if text.isascii():
+        alpha_count = len(text.encode("ascii").translate(None, _ASCII_NONALPHA))
+    else:
+        alpha_count = sum(map(str.isalpha, text))
     if alpha_count < len(text) * 0.5:
         return False
 
     # Skip lines starting with common non-heading patterns
-    lower = text.lower()
-    skip_patterns = [
-        "provided ", "permission ", "reproduce ", "copyright ",
-        "http://", "https://", "arxiv:", "doi:",
-    ]
-    for pattern in skip_patterns:
-        if lower.startswith(pattern):
-            return False
+    if _SKIP_RE.match(text):
+        return False
 
     # Skip author-like patterns (name followed by asterisk or affiliation number)
-    if text.endswith("*") or text.endswith("\u2217"):
+    if text.endswith(("*", "\u2217")):
         return False
 
     return True
 
 
-def infer_headings(blocks: list[TextBlock], body_size: float, min_ratio: float = 1.15) -> list[dict]:
+def heading_level(font_size: float, is_bold: bool, body_size: float, min_ratio: float = 1.15) -> int:
+    """Heading level (1-4) for a font size and weight, or 0 for body text."""
+    ratio = font_size / body_size if body_size > 0 else 1.0
+
+    # Determine heading level based on font size ratio
+    if ratio >= 2.0 or (ratio >= 1.5 and is_bold):
+        return 1
+    if ratio >= 1.5 or (ratio >= 1.3 and is_bold):
+        return 2
+    if ratio >= 1.25 or (ratio >= 1.15 and is_bold):
+        return 3
+    if ratio >= min_ratio or is_bold:
+        return 4
+    return 0
+
+
+def infer_headings(lines: Lines, body_size: float, min_ratio: float = 1.15) -> list[dict]:
     """Infer headings based on font size relative to body text."""
     headings = []
-    seen_texts = set()  # Avoid duplicates
+    seen_texts = set()  # Candidate texts already accepted or rejected
+
+    # The level depends only on size and weight, and documents use few
+    # distinct sizes, so classify each size once (indexed by the 0/1 bold
+    # flag) and reduce the per-line work to a dict lookup
+    distinct_sizes = set(lines.sizes)
+    levels = tuple(
+        {size: heading_level(size, is_bold, body_size, min_ratio) for size in distinct_sizes}
+        for is_bold in (False, True)
+    )
+
+    # Loop invariants: bound methods
+    add_heading = headings.append
+    mark_seen = seen_texts.add
+
+    for text, font_size, is_bold, page in zip(*lines):
+        # Reject body text before the string checks below
+        level = levels[is_bold][font_size]
+        if not level:
+            continue
 
-    for block in blocks:
-        # Skip if already seen (exact match)
-        if block.text in seen_texts:
+        # Skip if already seen (exact match). The heuristics depend only on
+        # the text, so repeated lines such as running headers are decided
+        # once whether they were accepted or rejected.
+        if text in seen_texts:
             continue
+        mark_seen(text)
 
         # Apply heading heuristics
-        if not is_likely_heading(block.text):
+        if not is_likely_heading(text):
             continue
 
-        ratio = block.font_size / body_size if body_size > 0 else 1.0
-
-        # Determine heading level based on font size ratio
-        level = 0
-        if ratio >= 2.0 or (ratio >= 1.5 and block.is_bold):
-            level = 1
-        elif ratio >= 1.5 or (ratio >= 1.3 and block.is_bold):
-            level = 2
-        elif ratio >= 1.25 or (ratio >= 1.15 and block.is_bold):
-            level = 3
-        elif ratio >= min_ratio or block.is_bold:
-            level = 4
-
-        if level > 0:
-            headings.append({
-                "level": level,
-                "text": block.text,
-                "page": block.page,
-                "font_size": round(block.font_size, 2),
-            })
-            seen_texts.add(block.text)
+        add_heading({
+            "level": level,
+            "text": text,
+            "page": page,
+            "font_size": round(font_size, 2),
+        })
 
     return headings
 
 
-def detect_tables(doc: fitz.Document) -> list[dict]:
-    """Basic table detection using PyMuPDF's table finder."""
-    tables = []
-
-    for page_num, page in enumerate(doc):
-        try:
-            # PyMuPDF 1.23+ has find_tables()
-            page_tables = page.find_tables()
-            for i, table in enumerate(page_tables):
-                # Extract table data
-                data = table.extract()
-                if data and len(data) > 1:  # At least header + 1 row
-                    tables.append({
-                        "page": page_num + 1,
-                        "rows": len(data),
-                        "cols": len(data[0]) if data else 0,
-                        "headers": data[0] if data else [],
-                    })
-        except AttributeError:
-            # Older PyMuPDF version without find_tables
-            pass
-
-    return tables
-
-
-def extract_structure(pdf_path: Optional[str] = None, pdf_bytes: Optional[bytes] = None) -> dict:
-    """Extract structure from PDF file or bytes."""
+def _cache_key(pdf_path: Optional[str], pdf_bytes: Optional[bytes]) -> tuple:
+    """Identify a document: content digest for bytes, path/mtime/size for files."""
     if pdf_bytes:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    elif pdf_path:
-        doc = fitz.open(pdf_path)
-    else:
-        raise ValueError("Must provide pdf_path or pdf_bytes")
+        return ("bytes", hashlib.blake2b(pdf_bytes, digest_size=16).digest())
+    if pdf_path:
+        st = os.stat(pdf_path)
+        return ("path", os.path.abspath(pdf_path), st.st_mtime_ns, st.st_size)
+    raise ValueError("Must provide pdf_path or pdf_bytes")
+
+
+def extract_structure(
+    pdf_path: Optional[str] = None,
+    pdf_bytes: Optional[bytes] = None,
+    fast_tables: bool = False,
+) -> dict:
+    """Extract structure from PDF file or bytes.
+
+    With fast_tables, table detection only runs on pages that contain vector
+    drawings. Results are kept in a small thread-safe LRU cache; each call
+    returns its own copy.
+    """
+    key = (_cache_key(pdf_path, pdf_bytes), fast_tables)
+    with _RESULT_CACHE_LOCK:
+        cached = _RESULT_CACHE.get(key)
+        if cached is not None:
+            _RESULT_CACHE.move_to_end(key)
+    if cached is not None:
+        # Cached entries are never mutated, so copying outside the lock is safe
+        return copy.deepcopy(cached)
+
+    # Extract without holding the lock so other documents are not blocked
+    result = _extract_structure(pdf_path, pdf_bytes, fast_tables)
+    cached = copy.deepcopy(result)
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE[key] = cached
+        _RESULT_CACHE.move_to_end(key)
+        if len(_RESULT_CACHE) > RESULT_CACHE_SIZE:
+            _RESULT_CACHE.popitem(last=False)
+
+    return result
+
+
+def _extract_structure(
+    pdf_path: Optional[str],
+    pdf_bytes: Optional[bytes],
+    fast_tables: bool,
+) -> dict:
+    """Uncached extraction behind extract_structure()."""
+    doc = open_pdf(pdf_path, pdf_bytes)
 
     try:
-        # Extract text blocks with font info
-        blocks = extract_text_blocks(doc)
+        # Extract text lines with font info and detect tables. PyMuPDF holds
+        # the GIL for most of its page work, so larger documents are split
+        # across processes.
+        page_count = len(doc)
+        if page_count < PARALLEL_MIN_PAGES or available_cpus() < 2:
+            lines, tables = process_pages(doc, fast_tables=fast_tables)
+        else:
+            lines, tables = process_pages_parallel(pdf_path, pdf_bytes, page_count, fast_tables)
 
         # Find body text size
-        body_size = find_body_font_size(blocks)
+        body_size = find_body_font_size(lines.sizes)
 
         # Infer headings
-        headings = infer_headings(blocks, body_size)
-
-        # Detect tables
-        tables = detect_tables(doc)
+        headings = infer_headings(lines, body_size)
 
         # Infer title (first large heading, usually on page 1)
         title = ""
@@ -236,37 +438,104 @@ def extract_structure(pdf_path: Optional[str] = None, pdf_bytes: Optional[bytes]
             "body_font_size": round(body_size, 2),
             "headings": headings,
             "tables": tables,
-            "page_count": len(doc),
+            "page_count": page_count,
         }
     finally:
         doc.close()
 
 
-def main():
-    """CLI interface: reads PDF from stdin or file argument."""
-    import io
+def _dumps(obj: dict) -> bytes:
+    """Encode a result as indented JSON, newline included."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, indent=2) + "\n").encode()
+
+
+def _dumps_line(obj: dict) -> bytes:
+    """Encode one JSON Lines record, newline included."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj) + "\n").encode()
+
+
+def write_jsonl(result: dict, out) -> None:
+    """Write a structure result as JSON Lines, one record at a time."""
+    out.write(_dumps_line({
+        "type": "document",
+        "title": result["title"],
+        "body_font_size": result["body_font_size"],
+        "page_count": result["page_count"],
+    }))
+    for heading in result["headings"]:
+        out.write(_dumps_line({"type": "heading", **heading}))
+    for table in result["tables"]:
+        out.write(_dumps_line({"type": "table", **table}))
+
+
+@contextlib.contextmanager
+def stdout_to_devnull():
+    """Point the stdout file descriptor at the null device.
+
+    Unlike swapping sys.stdout, this also silences output written by
+    MuPDF's C code, and nothing is buffered in Python.
+    """
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    devnull_fd = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull_fd, 1)
+        yield
+    finally:
+        # Flush Python-level prints while they still go to the null device
+        sys.stdout.flush()
+        os.dup2(saved_fd, 1)
+        os.close(devnull_fd)
+        os.close(saved_fd)
 
-    # Capture stdout during PDF processing (PyMuPDF prints warnings there)
-    old_stdout = sys.stdout
-    sys.stdout = io.StringIO()
 
+def main():
+    """CLI interface: reads PDF from stdin or file argument."""
+    parser = argparse.ArgumentParser(description="Extract PDF structure as JSON.")
+    parser.add_argument("pdf", nargs="?", default="-", help="PDF file path, or - to read stdin")
+    parser.add_argument(
+        "--jsonl", action="store_true",
+        help="write JSON Lines records instead of one JSON document",
+    )
+    parser.add_argument(
+        "--fast-tables", action="store_true",
+        help="only look for tables on pages with vector drawings (misses borderless tables)",
+    )
+    args = parser.parse_args()
+
+    tmp_path = None
     try:
-        if len(sys.argv) > 1 and sys.argv[1] != "-":
+        if args.pdf != "-":
             # File path provided
-            result = extract_structure(pdf_path=sys.argv[1])
+            pdf_path = args.pdf
         else:
-            # Read from stdin
-            pdf_bytes = sys.stdin.buffer.read()
-            if not pdf_bytes:
-                sys.stdout = old_stdout
+            # Spool stdin to a temporary file instead of holding it in memory,
+            # so MuPDF and any worker processes open it by path
+            fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as tmp:
+                shutil.copyfileobj(sys.stdin.buffer, tmp)
+                size = tmp.tell()
+            if not size:
                 print(json.dumps({"error": "No input provided"}))
                 sys.exit(1)
-            result = extract_structure(pdf_bytes=pdf_bytes)
+            pdf_path = tmp_path
+
+        # Silence stdout during PDF processing (PyMuPDF prints warnings there)
+        with stdout_to_devnull():
+            result = extract_structure(pdf_path=pdf_path, fast_tables=args.fast_tables)
     finally:
-        # Restore stdout
-        sys.stdout = old_stdout
+        if tmp_path is not None:
+            os.unlink(tmp_path)
 
-    print(json.dumps(result, indent=2))
+    if args.jsonl:
+        write_jsonl(result, sys.stdout.buffer)
+    else:
+        sys.stdout.buffer.write(_dumps(result))
+    sys.stdout.buffer.flush()
 
 
 if __name__ == "__main__":
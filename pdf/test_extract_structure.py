@@ -0,0 +1,128 @@
+"""
+Tests for extract_structure.py.
+
+Builds small PDFs with PyMuPDF and skips when it is not installed. Run with:
+
+    python3 -m unittest discover -s pdf
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    raise unittest.SkipTest("PyMuPDF not installed")
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import extract_structure as es  # noqa: E402
+
+
+def write_pdf(path: str, page_count: int, title: str = "Document Title") -> None:
+    """Write a PDF with one large heading and a few lines of body text per page.
+
+    The last page also holds a ruled 3x3 table.
+    """
+    doc = fitz.open()
+    for page_num in range(page_count):
+        page = doc.new_page()
+        heading = title if page_num == 0 else f"Chapter {page_num} Overview"
+        page.insert_text((50, 60), heading, fontsize=24)
+        for i in range(10):
+            text = f"Body line {i}. Page {page_num} text"
+            page.insert_text((50, 100 + i * 14), text, fontsize=10)
+
+    page = doc[page_count - 1]
+    for row in range(3):
+        for col in range(3):
+            cell = fitz.Rect(50 + col * 80, 300 + row * 20, 130 + col * 80, 320 + row * 20)
+            page.draw_rect(cell)
+            page.insert_text((cell.x0 + 3, cell.y0 + 14), f"r{row}c{col}", fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+class ExtractStructureTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "doc.pdf")
+        es._RESULT_CACHE.clear()
+
+    def test_parallel_merges_in_page_order(self):
+        page_count = 9
+        write_pdf(self.path, page_count)
+
+        doc = es.open_pdf(self.path)
+        try:
+            expected_lines, expected_tables = es.process_pages(doc)
+        finally:
+            doc.close()
+
+        # Force several workers even on a single-CPU host
+        with mock.patch.object(es, "available_cpus", return_value=4):
+            lines, tables = es.process_pages_parallel(self.path, None, page_count)
+
+        self.assertEqual(lines, expected_lines)
+        self.assertEqual(tables, expected_tables)
+        self.assertEqual(list(lines.pages), sorted(lines.pages))
+        self.assertEqual(set(lines.pages), set(range(1, page_count + 1)))
+
+    def test_jsonl_records(self):
+        write_pdf(self.path, 3)
+        result = es.extract_structure(pdf_path=self.path)
+
+        out = io.BytesIO()
+        es.write_jsonl(result, out)
+        records = [json.loads(line) for line in out.getvalue().decode().splitlines()]
+
+        self.assertEqual(records[0], {
+            "type": "document",
+            "title": "Document Title",
+            "body_font_size": result["body_font_size"],
+            "page_count": 3,
+        })
+
+        # Headings follow the document record, then tables, each in order
+        types = [record["type"] for record in records[1:]]
+        heading_count = len(result["headings"])
+        self.assertEqual(types, ["heading"] * heading_count + ["table"] * len(result["tables"]))
+        self.assertTrue(result["tables"])
+
+        headings = records[1:1 + heading_count]
+        tables = records[1 + heading_count:]
+        self.assertEqual([{"type": "heading", **h} for h in result["headings"]], headings)
+        self.assertEqual([{"type": "table", **t} for t in result["tables"]], tables)
+        self.assertEqual(set(headings[0]), {"type", "level", "text", "page", "font_size"})
+        self.assertEqual(set(tables[0]), {"type", "page", "rows", "cols", "headers"})
+
+    def test_path_cache_misses_after_rewrite(self):
+        write_pdf(self.path, 2, title="First Title")
+
+        with mock.patch.object(es, "_extract_structure", wraps=es._extract_structure) as extract:
+            first = es.extract_structure(pdf_path=self.path)
+            self.assertEqual(es.extract_structure(pdf_path=self.path), first)
+            self.assertEqual(extract.call_count, 1)
+
+            # Returned results are copies; changing one leaves the cache intact
+            first["headings"].clear()
+            self.assertTrue(es.extract_structure(pdf_path=self.path)["headings"])
+
+            # Rewriting the file changes its mtime/size key, so the cache misses
+            write_pdf(self.path, 2, title="Second Title")
+            stat = os.stat(self.path)
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            second = es.extract_structure(pdf_path=self.path)
+            self.assertEqual(extract.call_count, 2)
+
+        self.assertEqual(first["title"], "First Title")
+        self.assertEqual(second["title"], "Second Title")
+
+
+if __name__ == "__main__":
+    unittest.main()